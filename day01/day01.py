@@ -3,6 +3,9 @@
 ## Jesse Williams | github.com/xram64
 ## Answers: [Part 1]: 1448, [Part 2]: 1471
 
+from collections import deque
+import numpy as np
+
 def count_increases(depths):
     increases = 0
     last_depth = None
@@ -14,22 +17,61 @@ def count_increases(depths):
 
     return increases
 
-if __name__ == "__main__":
-    depths = []
+def read_depths(filename, chunk_size=2**16):
+    # Lazily yields depth readings from a file, reading it in fixed-size chunks so that
+    #   only one chunk (plus a partial trailing line) is held in memory at a time
+    with open(filename, 'r') as f:
+        partial_line = ''
+        while chunk := f.read(chunk_size):
+            lines = (partial_line + chunk).split('\n')
+            partial_line = lines.pop()  # last piece may be cut off mid-line, so carry it into the next chunk
+
+            for line in lines:
+                if line.strip(): yield int(line)
+
+        if partial_line.strip(): yield int(partial_line)
+
+def count_window_increases(depths, window_size=1):
+    # Counts increases between consecutive sums of 'window_size' measurements in a single pass.
+    # Neighboring windows share (window_size - 1) terms, so comparing the window sums is the
+    #   same as comparing the newest depth against the depth that just left the window:
+    #   (d[i-N+1] + ... + d[i]) > (d[i-N] + ... + d[i-1])  <=>  d[i] > d[i-N]
+    # Only the last 'window_size' depths are kept, so memory use is O(window_size).
+    if window_size < 1: raise ValueError('Window size must be at least 1.')
+
+    window = deque(maxlen=window_size)
+    increases = 0
+
+    for depth in depths:
+        if (len(window) == window_size) and (depth > window[0]):
+            increases += 1
+        window.append(depth)  # pushes out window[0] once the window is full
+
+    return increases
 
-    def parse(line):
-        if line: return int(line)
+def load_depths(filename):
+    # Bulk-loads all depth readings from a file into an int array (whitespace-separated)
+    return np.fromfile(filename, dtype=np.int64, sep=' ')
 
-    with open('day01_input.txt', 'r') as f:
-        depths = list( map(parse, f.readlines()) )
+def count_increases_vectorized(depths, window_sizes=(1,)):
+    # Vectorized version of 'count_window_increases' for many window sizes over the same data.
+    # For each window size N, compares the array against a copy of itself shifted by N elements
+    #   (d[i] > d[i-N]), so the depths are loaded once and reused across all window sizes.
+    # Returns a dict mapping each window size to its number of increases.
+    depths = np.asarray(depths)
+    increases = {}
 
+    for window_size in window_sizes:
+        if window_size < 1: raise ValueError('Window size must be at least 1.')
+        increases[window_size] = int( np.count_nonzero(depths[window_size:] > depths[:-window_size]) )
+
+    return increases
+
+if __name__ == "__main__":
     ## Part 1
-    increases = count_increases(depths)
+    increases = count_window_increases(read_depths('day01_input.txt'), 1)
     print(f"[Part 1] There are {increases} increased measurements.")
 
     ## Part 2
-    window_sums = []
-    for i in range(2, len(depths)):
-        window_sums += [ depths[i-2] + depths[i-1] + depths[i] ]
-    increases = count_increases(window_sums)
+    increases = count_window_increases(read_depths('day01_input.txt'), 3)
     print(f"[Part 2] There are {increases} increased measurements within three-measurement windows.")
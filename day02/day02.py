@@ -3,7 +3,145 @@
 ## Jesse Williams | github.com/xram64
 ## Answers: [Part 1]: 1714950, [Part 2]: 1281977850
 
+import os
 import sys
+import numpy as np
+from collections import namedtuple
+from multiprocessing import Pool
+
+# Opcodes for encoding a course as arrays (see 'load_course')
+OP_FORWARD = 0
+OP_DOWN = 1
+OP_UP = 2
+OPCODES = {'forward': OP_FORWARD, 'down': OP_DOWN, 'up': OP_UP}
+
+# Lookup table from the first byte of a move to its opcode (-1 for anything else)
+OPCODE_FOR_BYTE = np.full(256, -1, dtype=np.int8)
+for name, op in OPCODES.items():
+    OPCODE_FOR_BYTE[ord(name[0])] = op
+
+def _encode_course(raw):
+    # Encodes the raw bytes of a course as two arrays: an opcode array and an integer step array
+    # The bytes are parsed as a whole, without making a Python object for each move:
+    #  - the opcode comes from the first byte of each line ('f', 'd', or 'u')
+    #  - the steps are built from the digit bytes between the space and the end of each line,
+    #    one place value at a time (working back from the end of the line)
+    if not raw.endswith(b'\n'): raw += b'\n'
+    data = np.frombuffer(raw, dtype=np.uint8)
+
+    # Find the start and end of each line (not counting any '\r'), skipping blank lines
+    line_ends = np.flatnonzero(data == ord('\n'))
+    line_starts = np.r_[0, line_ends[:-1] + 1]
+    line_ends -= (data[line_ends - 1] == ord('\r')) & (line_ends > line_starts)
+    nonblank = line_ends > line_starts
+    line_starts, line_ends = line_starts[nonblank], line_ends[nonblank]
+
+    ops = OPCODE_FOR_BYTE[data[line_starts]]
+    del line_starts
+
+    steps = np.zeros(len(line_ends), dtype=np.int64)
+    in_number = np.ones(len(line_ends), dtype=bool)  # lines whose digits haven't all been read yet
+    place_value = 1
+    for place in range(1, 20):
+        byte = data[np.maximum(line_ends - place, 0)]
+        is_digit = in_number & (byte >= ord('0')) & (byte <= ord('9'))
+
+        # The first non-digit before the end of a line must be the space before its steps
+        if (in_number & ~is_digit & ((place == 1) | (byte != ord(' ')))).any(): raise ValueError('Invalid move.')
+
+        steps += is_digit * ((byte - ord('0')).astype(np.int64) * place_value)
+        in_number = is_digit
+        if not in_number.any(): break
+        place_value *= 10
+    else:
+        raise ValueError('Invalid move.')  # too many digits for 64-bit steps
+
+    if (ops < 0).any(): raise ValueError('Invalid move.')
+
+    return ops, steps
+
+def load_course(filename, chunk_size=2**22):
+    # Parses a whole course file into two arrays: an opcode array and an integer step array
+    # The file is parsed about 'chunk_size' bytes at a time (ending each chunk on a full line),
+    #   so the memory used while parsing doesn't grow with the file size.
+    ops_chunks, steps_chunks = [], []
+
+    with open(filename, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            chunk += f.readline()  # finish the last line of the chunk
+            ops, steps = _encode_course(chunk)
+            ops_chunks.append(ops)
+            steps_chunks.append(steps)
+
+    if not ops_chunks: return np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64)
+    return np.concatenate(ops_chunks), np.concatenate(steps_chunks)
+
+def _course_deltas(ops, steps):
+    # Splits an encoded course into its forward steps and its signed vertical steps (down = +, up = -)
+    forward = np.where(ops == OP_FORWARD, steps, 0)
+    vertical = np.where(ops == OP_DOWN, steps, 0) - np.where(ops == OP_UP, steps, 0)
+    return forward, vertical
+
+
+# Any run of moves can be summarized by its effect on a submarine, given the aim it starts with:
+#   hpos  -> hpos + hpos_change
+#   aim   -> aim + aim_change                              (for SubmarineMove, this is the depth change)
+#   depth -> depth + depth_change + (aim × hpos_change)    (depth_change assumes a starting aim of 0)
+# Summaries of consecutive runs combine in order (see 'combine_summaries'), so a course can be split up,
+#   summarized piece by piece (even in separate processes), and the pieces reduced back together.
+CourseSummary = namedtuple('CourseSummary', ['hpos_change', 'aim_change', 'depth_change'])
+EMPTY_SUMMARY = CourseSummary(0, 0, 0)
+
+# State of a SubmarineAim after some number of moves (see 'CourseTrajectory')
+Position = namedtuple('Position', ['hpos', 'depth', 'aim'])
+
+def summarize_course(ops, steps):
+    # Returns the CourseSummary of an encoded course
+    # The aim after each move is the running sum of the up/down steps, and each forward move
+    #   adds (steps × aim) to the depth, so the depth change is the dot product of the two.
+    # Vertical steps are 0 on forward moves, so the running aim at a forward move is the aim before it.
+    forward, vertical = _course_deltas(ops, steps)
+    return CourseSummary( int(forward.sum()), int(vertical.sum()), int(np.dot(forward, np.cumsum(vertical))) )
+
+def combine_summaries(first, second):
+    # Returns the summary of running the moves of 'first' followed by the moves of 'second'
+    # The second run starts with the aim left over from the first, which adds (aim × hpos) to its depth change
+    return CourseSummary(
+        first.hpos_change + second.hpos_change,
+        first.aim_change + second.aim_change,
+        first.depth_change + second.depth_change + first.aim_change*second.hpos_change
+    )
+
+def _summarize_byte_range(byte_range):
+    # Summarizes the moves whose lines start within [start, end) of a course file
+    filename, start, end = byte_range
+
+    with open(filename, 'rb') as f:
+        if start > 0:
+            # Skip the rest of a line that started in the previous range
+            f.seek(start - 1)
+            f.readline()
+
+        if f.tell() >= end: return EMPTY_SUMMARY
+
+        data = f.read(end - f.tell())
+        if not data.endswith(b'\n'):
+            data += f.readline()  # finish the last line, which started inside this range
+
+    return summarize_course( *_encode_course(data) )
+
+def summarize_course_file(filename, processes=None, chunk_size=2**26):
+    # Summarizes a whole course file by splitting it into byte ranges of about 'chunk_size' bytes,
+    #   summarizing each range in a pool of worker processes, and combining the results in order
+    file_size = os.path.getsize(filename)
+    byte_ranges = [(filename, start, min(start + chunk_size, file_size)) for start in range(0, file_size, chunk_size)]
+
+    summary = EMPTY_SUMMARY
+    with Pool(processes) as pool:
+        for range_summary in pool.imap(_summarize_byte_range, byte_ranges):
+            summary = combine_summaries(summary, range_summary)
+
+    return summary
 
 class SubmarineMove():
     def __init__(self, initial_hpos=0, initial_depth=0):
@@ -25,6 +163,15 @@ class SubmarineMove():
             print('Error: Invalid move.')
             sys.exit()
 
+    def doSummary(self, summary):
+        # Applies a CourseSummary, with the same result as calling doMove on each of its moves
+        self.hpos += summary.hpos_change
+        self.depth += summary.aim_change  # up/down moves change depth directly in this model
+
+    def doCourse(self, ops, steps):
+        # Runs a whole encoded course (from 'load_course') at once, with the same result as calling doMove on each move
+        self.doSummary( summarize_course(ops, steps) )
+
 class SubmarineAim():
     def __init__(self, initial_hpos=0, initial_depth=0, initial_aim=0):
         self.hpos = initial_hpos
@@ -47,23 +194,111 @@ class SubmarineAim():
             print('Error: Invalid move.')
             sys.exit()
 
+    def doSummary(self, summary):
+        # Applies a CourseSummary, with the same result as calling doMove on each of its moves
+        self.depth += summary.depth_change + self.aim*summary.hpos_change
+        self.hpos += summary.hpos_change
+        self.aim += summary.aim_change
+
+    def doCourse(self, ops, steps):
+        # Runs a whole encoded course (from 'load_course') at once, with the same result as calling doMove on each move
+        self.doSummary( summarize_course(ops, steps) )
+
+class CourseTrajectory():
+    # Answers "where was the sub after move k?" for any k without replaying the whole course.
+    # Positions follow the SubmarineAim model; in the SubmarineMove model, the depth is the aim.
+    # The state (hpos, depth, aim) after every 'interval' moves is stored as a checkpoint, so any
+    #   query only replays at most 'interval' moves from the nearest checkpoint before it.
+    def __init__(self, ops, steps, interval=1024, checkpoints=None):
+        if interval < 1: raise ValueError('Checkpoint interval must be at least 1.')
+
+        self.ops = ops
+        self.steps = steps
+        self.interval = interval
+        self.moves = len(ops)
+
+        # checkpoints[i] holds the (hpos, depth, aim) state after (i × interval) moves
+        self.checkpoints = checkpoints if (checkpoints is not None) else self._buildCheckpoints()
+
+    def _buildCheckpoints(self, block_checkpoints=1024):
+        # Replays the course in blocks of moves so that memory use doesn't grow with the course length
+        n_checkpoints = self.moves//self.interval + 1
+        checkpoints = np.zeros((n_checkpoints, 3), dtype=np.int64)
+
+        block_size = self.interval*block_checkpoints
+        last_checkpoint_move = (n_checkpoints - 1)*self.interval
+        state = checkpoints[0]
+        for block_start in range(0, last_checkpoint_move, block_size):
+            block_end = min(block_start + block_size, last_checkpoint_move)
+            states = self._replay(state, block_start, block_end)
+            first = block_start//self.interval + 1
+            checkpoints[first:first + len(states)//self.interval] = states[self.interval-1::self.interval]
+            state = states[-1]
+
+        return checkpoints
+
+    def _replay(self, state, start, stop):
+        # Returns an array with the (hpos, depth, aim) state after each move in [start, stop),
+        #   beginning from the given state before move 'start'
+        forward, vertical = _course_deltas(self.ops[start:stop], self.steps[start:stop])
+        states = np.empty((stop - start, 3), dtype=np.int64)
+
+        running_aim = state[2] + np.cumsum(vertical)
+        states[:, 0] = state[0] + np.cumsum(forward)
+        states[:, 1] = state[1] + np.cumsum(forward*running_aim)
+        states[:, 2] = running_aim
+        return states
+
+    def positionAfter(self, k):
+        # Returns the Position after the first k moves (k = 0 is the starting position)
+        if not (0 <= k <= self.moves): raise IndexError('Move index out of range.')
+
+        checkpoint = k//self.interval
+        state = self.checkpoints[checkpoint]
+        if k > checkpoint*self.interval:
+            state = self._replay(state, checkpoint*self.interval, k)[-1]
+
+        return Position(*(int(v) for v in state))
+
+    def positionsBetween(self, start, stop):
+        # Returns an array of the (hpos, depth, aim) states after each of the first k moves, for k in [start, stop)
+        if not (0 <= start <= stop <= self.moves + 1): raise IndexError('Move range out of range.')
+        if start == stop: return np.empty((0, 3), dtype=np.int64)
+
+        checkpoint = start//self.interval
+        states = np.vstack(( self.checkpoints[checkpoint], self._replay(self.checkpoints[checkpoint], checkpoint*self.interval, stop - 1) ))
+        return states[start - checkpoint*self.interval:]
+
+    def save(self, filename):
+        # Saves the checkpoint index to a file (see 'load_trajectory')
+        np.savez(filename, checkpoints=self.checkpoints, interval=self.interval, moves=self.moves)
+
+def load_trajectory(course_filename, interval=1024):
+    # Loads a course file along with its checkpoint index, which is kept next to the course file.
+    # The index is rebuilt (and saved) if it is missing, older than the course, or made for a different interval.
+    ops, steps = load_course(course_filename)
+    index_filename = os.path.splitext(course_filename)[0] + '_trajectory.npz'
+
+    if os.path.exists(index_filename) and (os.path.getmtime(index_filename) >= os.path.getmtime(course_filename)):
+        with np.load(index_filename) as index:
+            if (int(index['interval']) == interval) and (int(index['moves']) == len(ops)):
+                return CourseTrajectory(ops, steps, interval, checkpoints=index['checkpoints'])
+
+    trajectory = CourseTrajectory(ops, steps, interval)
+    trajectory.save(index_filename)
+    return trajectory
+
 if __name__ == '__main__':
-    with open('day02_input.txt', 'r') as f:
-        def tupletize(line): return tuple( line.split() )
-        course = list( map(tupletize, f.readlines()) )
+    ops, steps = load_course('day02_input.txt')
 
     ## Part 1
     sub = SubmarineMove()
-
-    for move in course:
-        sub.doMove(move)
+    sub.doCourse(ops, steps)
 
     print(f"[Part 1] Final horizontal position: {sub.hpos}. Final depth: {sub.depth}. Product: {sub.hpos*sub.depth}.")
 
     ## Part 2
     sub = SubmarineAim()
-
-    for move in course:
-        sub.doMove(move)
+    sub.doCourse(ops, steps)
 
     print(f"[Part 2] Final horizontal position: {sub.hpos}. Final depth: {sub.depth}. Product: {sub.hpos*sub.depth}.")
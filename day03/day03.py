@@ -3,7 +3,7 @@
 ## Jesse Williams | github.com/xram64
 ## Answers: [Part 1]: 3633500, [Part 2]: 4550283
 
-import sys
+import numpy as np
 
 # Return most commonly-found bit, breaking ties in favor of '1'
 def get_most_common_bit(numbers, pos):
@@ -20,21 +20,77 @@ def get_most_common_bit(numbers, pos):
 def get_least_common_bit(numbers, pos):
     return (get_most_common_bit(numbers, pos) ^ 1)
 
+# Load diagnostic numbers as a 2D bit matrix, with one row per number and one column per bit position (most significant first)
+def load_diagnostics(filename):
+    with open(filename, 'rb') as f:
+        lines = f.read().split()
+
+    width = len(lines[0])
+    return np.frombuffer(b''.join(lines), dtype=np.uint8).reshape(-1, width) - ord('0')
+
+# Pack the rows of a bit matrix into unsigned integers (up to 64 bits wide)
+def pack_bits(bits):
+    weights = np.left_shift(np.uint64(1), np.arange(bits.shape[1] - 1, -1, -1, dtype=np.uint64))
+    return (bits.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+
+# Return the most common bit in every position at once, from the 1-counts of all columns (ties go to '1')
+def get_most_common_bits(bits):
+    ones = bits.sum(axis=0, dtype=np.int64)
+    return (2*ones >= len(bits)).astype(np.uint8)
+
+# Convert a row of bits (most significant first) to an integer
+def bits_to_int(bits):
+    return int(''.join(str(b) for b in bits), 2) if len(bits) else 0
+
+# Bit criteria for ratings: given the number of 0's and 1's in a position, return the bit to keep
+def oxygen_bit_criteria(zeros, ones):
+    return 1 if (ones >= zeros) else 0  # most common bit, breaking ties in favor of '1'
+
+def co2_bit_criteria(zeros, ones):
+    return 0 if (zeros <= ones) else 1  # least common bit, breaking ties in favor of '0'
+
+class DiagnosticIndex():
+    # Answers rating queries without copying any numbers.
+    # The numbers are packed and sorted once. Numbers sharing a prefix of bits then sit in one
+    #   contiguous range [lo, hi), with the 0's in the next position before the 1's, so each
+    #   filtering step is a bisection that narrows the range.
+    def __init__(self, bits):
+        self.width = bits.shape[1]
+        self.values = np.sort( pack_bits(bits) )
+
+    def _split(self, lo, hi, pos):
+        # Returns the index in [lo, hi) where bit 'pos' (counting from the most significant bit) changes from 0 to 1
+        shift = self.width - 1 - pos
+        prefix = (int(self.values[lo]) >> (shift + 1)) << (shift + 1)
+        return lo + int( np.searchsorted(self.values[lo:hi], np.uint64(prefix | (1 << shift))) )
+
+    def rating(self, bit_criteria):
+        # Filters the numbers one bit position at a time, keeping the bit chosen by 'bit_criteria', until one number is left
+        lo, hi = 0, len(self.values)
+
+        for pos in range(self.width):
+            split = self._split(lo, hi, pos)
+            if bit_criteria(split - lo, hi - split) == 1:
+                lo = split
+            else:
+                hi = split
+
+            if (hi - lo) == 1:
+                return int(self.values[lo])
+            elif (hi - lo) <= 0:
+                raise ValueError('No numbers left matching bit criteria.')
+
+        raise ValueError('Multiple numbers found matching bit criteria.')
+
 
 if __name__ == '__main__':
-    with open('day03_input.txt', 'r') as f:
-        def parse(line): return [int(bit) for bit in list(line) if (bit != '\n')]
-        diag_numbers = list( map(parse, f.readlines()) )
-    diag_numbers_len = len(diag_numbers[0])
+    diag_bits = load_diagnostics('day03_input.txt')
+    diag_numbers_len = diag_bits.shape[1]
 
     ##############
     ### Part 1 ###
-    most_common_bits = ''
-    for pos in range(diag_numbers_len):
-        most_common_bits += str( get_most_common_bit(diag_numbers, pos) )
-
     # Epsilon rate: Most common bits from input
-    ε = int(most_common_bits, 2)
+    ε = bits_to_int( get_most_common_bits(diag_bits) )
 
     # Gamma rate: Least common bits from input
     γ = ε ^ int('1'*diag_numbers_len, 2)  # invert bits in ε
@@ -43,44 +99,12 @@ if __name__ == '__main__':
 
     ##############
     ### Part 2 ###
-    oxy_rating_filtered_nums = diag_numbers
-    co2_rating_filtered_nums = diag_numbers
+    diag_index = DiagnosticIndex(diag_bits)
 
     ## Oxygen generator rating
-    for pos in range(diag_numbers_len):
-        # Find most common bit (MCB) and filter numbers not matching bit criteria
-        mcb = get_most_common_bit(oxy_rating_filtered_nums, pos)
-        oxy_rating_filtered_nums = list( filter(lambda num: num[pos] == mcb, oxy_rating_filtered_nums) )
-
-        if len(oxy_rating_filtered_nums) == 1:
-            # Convert final element matching bit criteria to a decimal integer
-            oxy_rating = int(''.join( [str(n) for n in oxy_rating_filtered_nums[0]] ), 2)
-            break
-
-        elif len(oxy_rating_filtered_nums) <= 0:
-            print('Error: Oxygen rating list empty.')
-            sys.exit()
-    else:
-        print('Error: Multiple numbers found matching bit criteria for oxygen rating.')
-        sys.exit()
+    oxy_rating = diag_index.rating(oxygen_bit_criteria)
 
     ## CO2 scrubber rating
-    for pos in range(diag_numbers_len):
-        # Find least common bit (LCB) and filter numbers not matching bit criteria
-        lcb = get_least_common_bit(co2_rating_filtered_nums, pos)
-        co2_rating_filtered_nums = list( filter(lambda num: num[pos] == lcb, co2_rating_filtered_nums) )
-
-        if len(co2_rating_filtered_nums) == 1:
-            # Convert final element matching bit criteria to a decimal integer
-            co2_rating = int(''.join( [str(n) for n in co2_rating_filtered_nums[0]] ), 2)
-            break
-
-        elif len(co2_rating_filtered_nums) <= 0:
-            print('Error: CO2 rating list empty.')
-            sys.exit()
-    else:
-        print('Error: Multiple numbers found matching bit criteria for CO2 rating.')
-        sys.exit()
-
+    co2_rating = diag_index.rating(co2_bit_criteria)
 
     print(f"[Part 2] Oxygen generator rating: {oxy_rating}. CO2 scrubber rating: {co2_rating}. Life support rating: {oxy_rating*co2_rating}.")
@@ -3,7 +3,7 @@
 ## Jesse Williams | github.com/xram64
 ## Answers: [Part 1]: 58838, [Part 2]: 6256
 
-from math import floor
+import numpy as np
 
 class Board():
     def __init__(self, raw_board, id):
@@ -15,8 +15,24 @@ class Board():
         for line in raw_board:
             self.grid.append( line.split() )
 
-        # The marked_grid will be a 5x5 Boolean 2D list to keep track of the marked positions on the board
-        self.marked_grid = [ [False]*5, [False]*5, [False]*5, [False]*5, [False]*5 ]
+        # Boards are square (N×N), with N taken from the number of rows
+        self.size = len(self.grid)
+
+        # The marked_grid will be an N×N Boolean 2D list to keep track of the marked positions on the board
+        self.marked_grid = [ [False]*self.size for _ in range(self.size) ]
+
+        # Count the marked cells in each row and column, so a win can be spotted as soon as a cell is marked
+        self.row_hits = [0]*self.size
+        self.col_hits = [0]*self.size
+
+        # Keep a running sum of the unmarked numbers (for score calculation)
+        self.unmarked_sum = sum( int(num) for row in self.grid for num in row )
+
+        # Map each number on the board to its (row, col) position
+        self.cells = {}
+        for row_n, row in enumerate(self.grid):
+            for col_n, num in enumerate(row):
+                self.cells.setdefault(num, (row_n, col_n))
 
         # 'win' will be False unless the board wins, which will set it to a tuple indicating
         #   whether the win was in a row or column, the row/col index, and the row/col list itself
@@ -32,52 +48,83 @@ class Board():
         # Returns True if the number was found and False if it wasn't
         self.last_checked_number = num
 
-        for row_n, row in enumerate(self.grid):
-            try:  # number found in this row
-                col_n = row.index(num)
-                self.marked_grid[row_n][col_n] = True
-                return True
-
-            except ValueError:  # number not found in this row (thrown if index() fails)
-                continue
-
+        if num in self.cells:
+            self.mark_cell(*self.cells[num], num)
+            return True
         else:
             return False
 
-    def check_for_win(self):
-        # Checks if this board is a winning board (all numbers marked in a row or col)
+    def mark_cell(self, row_n, col_n, num):
+        # Marks a cell already known to hold the given bingo number (see 'build_number_index')
+        self.last_checked_number = num
+        if self.marked_grid[row_n][col_n]: return  # already marked
+
+        self.marked_grid[row_n][col_n] = True
+        self.unmarked_sum -= int(self.grid[row_n][col_n])
+
+        self.row_hits[row_n] += 1
+        self.col_hits[col_n] += 1
 
-        # Check for winning rows
-        for row_n, row in enumerate(self.marked_grid):
-            if not (False in row):
-                # If all elements in a row are True, we have a win on this row
+        # Only the row and column of the newly marked cell can have just been completed
+        if not self.win:
+            if self.row_hits[row_n] == self.size:
                 self.win = ('row', row_n, self.grid[row_n])
-                return self.win
-
-        # Check for winning columns
-        for col_n in range(5):
-            for row_n in range(5):
-                # If any element in this column is False, skip to the next column
-                if self.marked_grid[row_n][col_n] == False:
-                    break
-            else:
-                # If no False's are found, we have a winning column
+            elif self.col_hits[col_n] == self.size:
                 self.win = ('col', col_n, [r[col_n] for r in self.grid])
-                return self.win
 
-        return False
+    def check_for_win(self):
+        # Checks if this board is a winning board (all numbers marked in a row or col)
+        # Wins are detected as cells are marked, so this just reports the result
+        return self.win
 
     def calculate_score(self):
-        sum = 0
+        self.score = self.unmarked_sum * int(self.last_checked_number)
+        return self.score
 
-        for row_n, row in enumerate(self.marked_grid):
-            for col_n, mark in enumerate(row):
-                if mark == False:
-                    # Only add the unmarked numbers
-                    sum += int(self.grid[row_n][col_n])
+def build_number_index(boards):
+    # Builds an inverted index mapping each number to the list of cells holding it across all boards,
+    #   as (board_id, row, col) tuples, so a drawn number only touches the boards that contain it
+    number_index = {}
 
-        self.score = sum * int(self.last_checked_number)
-        return self.score
+    for board in boards:
+        for row_n, row in enumerate(board.grid):
+            for col_n, num in enumerate(row):
+                number_index.setdefault(num, []).append( (board.id, row_n, col_n) )
+
+    return number_index
+
+def simulate_all_boards(numbers, boards):
+    # Finds the winning turn and score of every board at once, without drawing numbers one at a time.
+    # Each cell is replaced by the turn (draw index) its number is drawn on. A row or column is complete
+    #   on the turn of its last-drawn cell (its max), and a board wins on its earliest complete line.
+    # Returns two arrays indexed by board id: the winning turns (len(numbers) if a board never wins)
+    #   and the scores (0 if a board never wins). Boards must all be the same size.
+    drawn = np.array([int(n) for n in numbers], dtype=np.int64)
+    grids = np.array([[[int(num) for num in row] for row in board.grid] for board in boards], dtype=np.int64)
+    never = len(drawn)
+
+    # Look up the first draw of each number, with undrawn numbers set to 'never'
+    largest_number = max(drawn.max(), grids.max()) if len(drawn) else grids.max()
+    draw_turn = np.full(largest_number + 1, never, dtype=np.int64)
+    draw_turn[drawn[::-1]] = np.arange(len(drawn) - 1, -1, -1)  # reversed so the first draw of a repeated number wins
+    cell_turns = draw_turn[grids]
+
+    row_win_turns = cell_turns.max(axis=2).min(axis=1)
+    col_win_turns = cell_turns.max(axis=1).min(axis=1)
+    win_turns = np.minimum(row_win_turns, col_win_turns)
+
+    # Unmarked cells are the ones drawn after the winning turn
+    won = win_turns < never
+    unmarked_sums = np.where(cell_turns > win_turns[:, None, None], grids, 0).sum(axis=(1, 2))
+    last_numbers = drawn[np.minimum(win_turns, never - 1)] if len(drawn) else np.zeros(len(grids), dtype=np.int64)
+    scores = np.where(won, unmarked_sums * last_numbers, 0)
+
+    return win_turns, scores
+
+def winning_order(win_turns, number_of_draws):
+    # Returns the ids of the boards that win, in order of win (boards winning on the same turn are ordered by id)
+    order = np.argsort(win_turns, kind='stable')
+    return order[ win_turns[order] < number_of_draws ]
 
 
 if __name__ == '__main__':
@@ -86,30 +133,39 @@ if __name__ == '__main__':
         # First line of input is list of numbers in drawing order
         numbers = f.readline()
 
-        # Remaining lines in groups of 6 hold 1 new line followed by the 5 bingo board lines
+        # Remaining lines hold the bingo boards, each one preceded by a blank line
         board_data = f.readlines()
 
-    numbers = numbers.split(',')
+    numbers = [n.strip() for n in numbers.split(',')]
 
+    # Boards are separated by blank lines
     raw_boards = []
-    number_of_boards = floor(len(board_data) / 6)
-    for i in range(number_of_boards):
-        raw_boards.append( [c.strip() for c in board_data[(6*i + 1):(6*i + 6)]] )
+    raw_board = []
+    for line in board_data + ['']:
+        if line.strip():
+            raw_board.append(line.strip())
+        elif raw_board:
+            raw_boards.append(raw_board)
+            raw_board = []
 
     boards = []
     for id, raw_board in enumerate(raw_boards):
         boards.append( Board(raw_board, id) )
 
+    number_index = build_number_index(boards)
+
     # Check all numbers and keep track of winning boards in order of win, along with their board number
     winning_boards = []
     for number in numbers:
-        for board in boards:
-            # Skip checking boards that won to make sure we don't keep changing their 'last_checked_number'
-            if (board not in winning_boards) and (board.check_number(number)):
-                # If we got True, the number is on the board, so now we check if the board won
-                if board.check_for_win():
-                    # If we don't get False, this board won
-                    winning_boards.append(board)
+        for board_id, row_n, col_n in number_index.get(number, []):
+            board = boards[board_id]
+            # Skip boards that already won to make sure we don't keep changing their 'last_checked_number'
+            if board.win: continue
+
+            board.mark_cell(row_n, col_n, number)
+            if board.check_for_win():
+                # If we don't get False, this board won
+                winning_boards.append(board)
 
     ## Part 1
     first_winning_board = winning_boards[0]
@@ -4,80 +4,317 @@
 ## Answers: [Part 1]: 5690, [Part 2]: 17741
 
 import re
+from bisect import bisect_left, bisect_right, insort
 from PIL import Image
 import numpy as np
-from collections import namedtuple
+from collections import namedtuple, defaultdict
 
-# Lines will have the 'x' and 'y' values of the initial point of a line segment,
-#   followed by the 'x' and 'y' values of the terminal point of the line segment.
-Line = namedtuple('Line', ['i_x', 'i_y', 't_x', 't_y'])
+def load_lines(filename):
+    # Parses a whole vent file into an (n × 4) int array, with one row of (i_x, i_y, t_x, t_y) per line segment
+    with open(filename, 'r') as f:
+        coords = re.findall(r'\d+', f.read())
+    return np.array(coords, dtype=np.int64).reshape(-1, 4)
 
-# Closure for a line segment 'y = mx + b' function
-def line_segment(m, b):
-    def y(x):
-        return (m*x + b)
-    return y
+def is_hv(lines):
+    # Returns a Boolean mask of the horizontal and vertical line segments
+    return (lines[:, 0] == lines[:, 2]) | (lines[:, 1] == lines[:, 3])
 
+def rasterize(lines):
+    # Returns the x and y coords of every grid point covered by each line segment, all generated at once.
+    # Uses only integer arithmetic: a segment with a change of (dx, dy) passes through a grid point
+    #   every (dx/g, dy/g) steps, where g = gcd(dx, dy), so it covers (g + 1) grid points in total.
+    #   For horizontal, vertical, and 45° lines, this steps one point at a time.
+    dx = lines[:, 2] - lines[:, 0]
+    dy = lines[:, 3] - lines[:, 1]
+    g = np.gcd(dx, dy)
+    steps = np.maximum(g, 1)  # a segment of a single point has g = 0
+    counts = g + 1
 
-if __name__ == '__main__':
-    with open('day05_input.txt', 'r') as f:
-        lines = f.readlines()
+    # For each generated point, find the segment it belongs to and how many steps it is from the initial point
+    segment = np.repeat(np.arange(len(lines)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
 
-    # We'll assume the grid starts from (0, 0) (= top-left corner) and just define the height and width
-    #   GRID_H: Value of the lowest vertical coord
-    #   GRID_W: Value of the right-most horizontal coord
-    GRID_H = 0
-    GRID_W = 0
+    xs = lines[segment, 0] + offset*(dx // steps)[segment]
+    ys = lines[segment, 1] + offset*(dy // steps)[segment]
+    return xs, ys
 
-    all_coords = []
+def count_vents(lines, shape):
+    # Returns an integer grid (indexed by [x, y]) with the number of line segments covering each grid point
+    grid = np.zeros(shape, dtype=np.int64)
+    np.add.at(grid, rasterize(lines), 1)  # unbuffered, so repeated points are all counted
+    return grid
 
-    for line in lines:
-        grp = re.search(r'^(\d+),(\d+) -> (\d+),(\d+)$', line).groups()
-        coord_map = Line( int(grp[0]), int(grp[1]), int(grp[2]), int(grp[3]) )
 
-        all_coords.append(coord_map)
+class SparseGrid():
+    # Sparse vent grid for huge coordinate spaces, which only stores the grid points that are covered.
+    # Each covered point (x, y) is stored under the linear key (x*height + y), with the keys kept sorted
+    #   in one int64 array alongside a uint8 array of their counts.
+    # Counts saturate at 255 instead of wrapping around, which is plenty for counting overlaps.
+    MAX_COUNT = 255
 
-        # While we're here, update the grid boundaries with the given coords
-        if max(coord_map.i_x, coord_map.t_x) > GRID_W:
-            GRID_W = max(coord_map.i_x, coord_map.t_x)
-        if max(coord_map.i_y, coord_map.t_y) > GRID_H:
-            GRID_H = max(coord_map.i_y, coord_map.t_y)
+    def __init__(self, height):
+        self.height = height  # every y coord must be less than this, so that keys are unique
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.uint8)
 
-    # Grid format:
-    #   N = N vents overlap the grid point (default=0 for no vents)
-    #   Array indices will correspond directly to the (1-indexed) coords, so we pad the array size by 1
-    grid_hv = np.zeros((GRID_W+1, GRID_H+1))   # grid containing only horizontal and vertical lines
-    grid = np.zeros((GRID_W+1, GRID_H+1))      # grid containing all lines
+    def add(self, xs, ys):
+        # Increments the count of each of the given grid points (repeated points are counted again)
+        if len(xs) == 0: return
+        keys, counts = np.unique(xs*self.height + ys, return_counts=True)
+        counts = np.minimum(counts, self.MAX_COUNT)
+
+        # Add to the counts of points already stored, then insert the rest in sorted order
+        pos = np.searchsorted(self.keys, keys)
+        stored = pos < len(self.keys)
+        stored[stored] = self.keys[pos[stored]] == keys[stored]
+        self.counts[pos[stored]] = np.minimum(self.counts[pos[stored]] + counts[stored], self.MAX_COUNT)
+
+        self.keys = np.insert(self.keys, pos[~stored], keys[~stored])
+        self.counts = np.insert(self.counts, pos[~stored], counts[~stored])
+
+    def count_at_least(self, n):
+        # Returns the number of grid points covered at least n times
+        return int( np.count_nonzero(self.counts >= n) )
+
+    def value_at(self, x, y):
+        # Returns the count at a single grid point
+        key = x*self.height + y
+        i = np.searchsorted(self.keys, key)
+        return int(self.counts[i]) if (i < len(self.keys)) and (self.keys[i] == key) else 0
+
+def count_vents_sparse(lines, batch_size=2**20):
+    # Sparse version of 'count_vents', which rasterizes the line segments in batches into a SparseGrid,
+    #   so memory use depends on the grid points covered rather than on the size of the grid.
+    # Each batch holds whole segments covering about 'batch_size' grid points in total (or a single longer segment).
+    grid = SparseGrid( int(lines[:, [1, 3]].max()) + 1 if len(lines) else 1 )
+
+    # Segment i covers (g + 1) grid points, so the running total of points splits the segments into batches
+    points = np.cumsum( np.gcd(lines[:, 2] - lines[:, 0], lines[:, 3] - lines[:, 1]) + 1 )
+    batch_start = 0
+    while batch_start < len(lines):
+        done = points[batch_start - 1] if batch_start else 0
+        batch_end = max( int(np.searchsorted(points, done + batch_size, side='right')), batch_start + 1 )
+        grid.add( *rasterize(lines[batch_start:batch_end]) )
+        batch_start = batch_end
+    return grid
+
+
+## Overlap statistics
+# histogram[n]: number of grid points covered by exactly n line segments
+# hottest: list of the most-covered grid points as (x, y, count), from highest count to lowest
+OverlapStats = namedtuple('OverlapStats', ['histogram', 'hottest'])
+
+def _hottest_cells(counts, top, x_offset=0, y_offset=0):
+    # Returns the 'top' highest counts in a 2D array as a list of (x, y, count), leaving out uncovered grid points
+    top = min(top, np.count_nonzero(counts))
+    if top <= 0: return []
+
+    flat = counts.ravel()
+    idx = np.argpartition(flat, -top)[-top:]
+    xs, ys = np.unravel_index(idx, counts.shape)
+    return [(int(x) + x_offset, int(y) + y_offset, int(flat[i])) for x, y, i in zip(xs, ys, idx)]
+
+def overlap_stats(grid, top=10):
+    # Returns the OverlapStats of a vent grid (either a dense grid from 'count_vents' or a SparseGrid),
+    #   with the histogram of overlap counts found in a single pass over the grid.
+    # A SparseGrid only stores covered grid points, so its histogram[0] is always 0.
+    if isinstance(grid, SparseGrid):
+        histogram = np.bincount(grid.counts, minlength=SparseGrid.MAX_COUNT + 1)
+        top = min(top, len(grid.counts))
+        idx = np.argpartition(grid.counts, -top)[-top:] if top > 0 else np.zeros(0, dtype=np.int64)
+        xs, ys = np.divmod(grid.keys[idx], grid.height)
+        hottest = [(int(x), int(y), int(grid.counts[i])) for x, y, i in zip(xs, ys, idx)]
+    else:
+        histogram = np.bincount(grid.ravel())
+        hottest = _hottest_cells(grid, top)
+
+    hottest = sorted(hottest, key=lambda cell: cell[2], reverse=True)[:top]
+    return OverlapStats(histogram, hottest)
+
+def count_at_least(histogram, threshold):
+    # Returns the number of grid points covered by at least 'threshold' line segments
+    return int( histogram[threshold:].sum() )
+
+
+## Images
+# Map each value in the grid to a color value, darker for higher values
+# https://www.desmos.com/calculator/af3ywlndbh
+def color_map(n):
+    return int(2**(-n+8) - 1)
+
+# Lookup table of 8-bit grayscale colors for every count (anything past 8 overlaps is black)
+COLOR_LUT = np.array([max(color_map(n), 0) for n in range(256)], dtype=np.uint8)
+
+def render_overlaps(grid, max_size=None):
+    # Returns a grayscale image of a vent grid (indexed by [x, y]), with colors looked up for the whole grid at once.
+    # If 'max_size' is given, larger grids are downsampled to a preview that fits within max_size × max_size pixels,
+    #   keeping the highest count within each block so overlaps stay visible.
+    if max_size and (max(grid.shape) > max_size):
+        factor = -(-max(grid.shape) // max_size)  # ceiling division
+        padded = np.zeros((-(-grid.shape[0] // factor)*factor, -(-grid.shape[1] // factor)*factor), dtype=grid.dtype)
+        padded[:grid.shape[0], :grid.shape[1]] = grid
+        grid = padded.reshape(padded.shape[0]//factor, factor, padded.shape[1]//factor, factor).max(axis=(1, 3))
+
+    # Images are indexed by [row, col] = [y, x], so the grid is transposed
+    return Image.fromarray( np.ascontiguousarray(COLOR_LUT[np.minimum(grid, 255)].T) )
+
+def save_overlap_tiles(grid, filename_prefix, tile_size=4096):
+    # Saves a large vent grid as a set of images of up to tile_size × tile_size pixels each,
+    #   named '<filename_prefix>_<tile x>_<tile y>.png'
+    for tile_x in range(0, grid.shape[0], tile_size):
+        for tile_y in range(0, grid.shape[1], tile_size):
+            tile = grid[tile_x:tile_x + tile_size, tile_y:tile_y + tile_size]
+            render_overlaps(tile).save(f'{filename_prefix}_{tile_x // tile_size}_{tile_y // tile_size}.png')
+
+
+## Analytic overlap counting (no rasterizing)
+# Horizontal, vertical, and 45° lines fall into four families. Within a family, every line has a constant
+#   'key' and each point on it has a 'pos' along the line, with neighboring grid points 1 pos apart.
+#   Both are linear in (x, y), stored as the (a, b) coefficients of (a*x + b*y).
+# Note: (x, y) starts from the top-left corner, so a 'diagonal' line runs down-right and an 'antidiagonal' line runs up-right.
+Family = namedtuple('Family', ['name', 'key', 'pos'])
+FAMILIES = [
+    Family('horizontal',   key=(0, 1),  pos=(1, 0)),  # y = key
+    Family('vertical',     key=(1, 0),  pos=(0, 1)),  # x = key
+    Family('diagonal',     key=(-1, 1), pos=(1, 0)),  # y - x = key
+    Family('antidiagonal', key=(1, 1),  pos=(1, 0)),  # x + y = key
+]
+
+def _apply(coef, x, y):
+    return coef[0]*x + coef[1]*y
 
+def _solve(coef1, v1, coef2, v2):
+    # Returns the (x, y) where (coef1 · (x, y) = v1) and (coef2 · (x, y) = v2), or None if it isn't a grid point
+    det = coef1[0]*coef2[1] - coef1[1]*coef2[0]
+    x, x_rem = divmod(v1*coef2[1] - coef1[1]*v2, det)
+    y, y_rem = divmod(coef1[0]*v2 - coef2[0]*v1, det)
+    return None if (x_rem or y_rem) else (x, y)
 
-    # Iterate through all coords and update grid points with the number of vents that occupy them
-    for coords in all_coords:
-        # If x-coords are the same for each point, we have a vertical line
-        if (coords.i_x == coords.t_x):
-            # Iterate through all y-values and increment vent count for those grid coords
-            left_y, right_y = min(coords.i_y, coords.t_y), max(coords.i_y, coords.t_y)
-            for y in range(left_y, right_y+1):
-                grid[coords.i_x, y] += 1
-                grid_hv[coords.i_x, y] += 1  # also update "h-v" grid since this is a vertical line
+def _family_of(i_x, i_y, t_x, t_y):
+    # Returns the index of the family (in FAMILIES) that a line segment belongs to
+    dx, dy = t_x - i_x, t_y - i_y
+    if dy == 0: return 0
+    elif dx == 0: return 1
+    elif dx == dy: return 2
+    elif dx == -dy: return 3
+    else: raise ValueError('Only horizontal, vertical, and 45° lines are supported.')
 
+def _merge_intervals(intervals):
+    # Sweeps over the (inclusive) pos intervals on a single line, returning two sorted lists of disjoint intervals:
+    #   the union of all intervals, and the parts covered by two or more intervals
+    events = sorted( [(start, 1) for start, _ in intervals] + [(end + 1, -1) for _, end in intervals] )
+    union, multi = [], []
+    depth = 0
+    union_start = multi_start = None
+
+    for i, (pos, change) in enumerate(events):
+        depth += change
+        if (i + 1 < len(events)) and (events[i + 1][0] == pos): continue  # apply all events at this pos first
+
+        if (depth >= 1) and (union_start is None): union_start = pos
+        elif (depth < 1) and (union_start is not None):
+            union.append( (union_start, pos - 1) )
+            union_start = None
+
+        if (depth >= 2) and (multi_start is None): multi_start = pos
+        elif (depth < 2) and (multi_start is not None):
+            multi.append( (multi_start, pos - 1) )
+            multi_start = None
+
+    return union, multi
+
+def _in_intervals(intervals, pos):
+    # Checks if a pos lies within a sorted list of disjoint (inclusive) intervals
+    i = bisect_right(intervals, (pos, float('inf'))) - 1
+    return (i >= 0) and (intervals[i][0] <= pos <= intervals[i][1])
+
+def _key_range(family, key, interval, other):
+    # Returns the range of the other family's key over an interval of a line in this family
+    ends = [_apply(other.key, *_solve(family.key, key, family.pos, pos)) for pos in interval]
+    return min(ends), max(ends)
+
+def _orthogonal_crossings(horizontals, verticals):
+    # Sweep line over u, finding every crossing between horizontal segments (w, u_1, u_2) and
+    #   vertical segments (u, w_1, w_2). The active horizontals are kept ordered by w, so each
+    #   vertical segment finds the ones it crosses by bisection. Returns a list of (u, w) crossings.
+    events = [(u_1, 0, w, w) for w, u_1, _ in horizontals]     # 0: horizontal starts
+    events += [(u, 1, w_1, w_2) for u, w_1, w_2 in verticals]  # 1: vertical crosses the sweep line
+    events += [(u_2, 2, w, w) for w, _, u_2 in horizontals]    # 2: horizontal ends
+    events.sort()
+
+    active = []
+    crossings = []
+    for u, kind, w_1, w_2 in events:
+        if kind == 0:
+            insort(active, w_1)
+        elif kind == 1:
+            crossings += [(u, w) for w in active[bisect_left(active, w_1):bisect_right(active, w_2)]]
         else:
-            # For a non-vertical line, we'll need to find the slope and intercept of the line segment
-            m = (coords.t_y - coords.i_y)/(coords.t_x - coords.i_x)
-            b = coords.i_y - m*coords.i_x
+            active.pop( bisect_left(active, w_1) )
+
+    return crossings
+
+def count_overlaps_analytic(lines):
+    # Counts the grid points covered by two or more line segments, without rasterizing the segments,
+    #   so the run time depends on the number of segments and crossings rather than on their lengths.
+    #  - Segments on the same line are merged by sweeping over their intervals, which gives the points
+    #    covered by 2+ segments of the same family (counted by interval length).
+    #  - Points where lines of two different families cross are found by a sweep line for each pair
+    #    of families (with their keys as the axes, so one family is horizontal and the other vertical).
+    #  - Each crossing point was already counted once for each family in which it is covered by 2+
+    #    segments, so the counts are corrected to count each point exactly once.
+    intervals = [defaultdict(list) for _ in FAMILIES]
+    for i_x, i_y, t_x, t_y in lines.tolist():
+        f = _family_of(i_x, i_y, t_x, t_y)
+        key = _apply(FAMILIES[f].key, i_x, i_y)
+        start, end = sorted( (_apply(FAMILIES[f].pos, i_x, i_y), _apply(FAMILIES[f].pos, t_x, t_y)) )
+        intervals[f][key].append( (start, end) )
+
+    unions = [{} for _ in FAMILIES]
+    multis = [{} for _ in FAMILIES]
+    total_overlaps = 0
+    for f in range(len(FAMILIES)):
+        for key, line_intervals in intervals[f].items():
+            unions[f][key], multis[f][key] = _merge_intervals(line_intervals)
+            total_overlaps += sum( end - start + 1 for start, end in multis[f][key] )
+
+    crossing_points = set()
+    for fa in range(len(FAMILIES)):
+        for fb in range(fa + 1, len(FAMILIES)):
+            family_a, family_b = FAMILIES[fa], FAMILIES[fb]
+
+            # With w = key of family A and u = key of family B, family A lines run along u and family B lines run along w
+            horizontals = [(key, *_key_range(family_a, key, interval, family_b)) for key, ivs in unions[fa].items() for interval in ivs]
+            verticals = [(key, *_key_range(family_b, key, interval, family_a)) for key, ivs in unions[fb].items() for interval in ivs]
 
-            y = line_segment(m, b)
+            for u, w in _orthogonal_crossings(horizontals, verticals):
+                point = _solve(family_a.key, w, family_b.key, u)
+                if point is not None:  # diagonals can cross between grid points
+                    crossing_points.add(point)
 
-            # Iterate through all x-values between the initial and terminal x-coords and
-            #   check if they have an integer y-value, based on the slope of the line
-            # If so, increment the vent count for those grid coords
-            left_x, right_x = min(coords.i_x, coords.t_x), max(coords.i_x, coords.t_x)
+    for x, y in crossing_points:
+        already_counted = 0
+        for f, family in enumerate(FAMILIES):
+            if _in_intervals(multis[f].get(_apply(family.key, x, y), []), _apply(family.pos, x, y)):
+                already_counted += 1
+        total_overlaps += 1 - already_counted
 
-            for x in range(left_x, right_x+1):
-                if y(x).is_integer():
-                    grid[x, int(y(x))] += 1
+    return total_overlaps
 
-                    # Only update "h-v" grid if this is a horizontal line
-                    if (m == 0): grid_hv[x, int(y(x))] += 1
+if __name__ == '__main__':
+    all_lines = load_lines('day05_input.txt')
+
+    # We'll assume the grid starts from (0, 0) (= top-left corner) and just define the height and width
+    #   GRID_H: Value of the lowest vertical coord
+    #   GRID_W: Value of the right-most horizontal coord
+    GRID_W = int( all_lines[:, [0, 2]].max() )
+    GRID_H = int( all_lines[:, [1, 3]].max() )
+
+    # Grid format:
+    #   N = N vents overlap the grid point (default=0 for no vents)
+    #   Array indices will correspond directly to the (1-indexed) coords, so we pad the array size by 1
+    grid_hv = count_vents(all_lines[is_hv(all_lines)], (GRID_W+1, GRID_H+1))   # grid containing only horizontal and vertical lines
+    grid = count_vents(all_lines, (GRID_W+1, GRID_H+1))                       # grid containing all lines
 
 
     # Output -- Console
@@ -92,32 +329,13 @@ if __name__ == '__main__':
 
 
     ## Output -- Image
-    # Make an image with 8-bit grayscale colors plus alpha channel
-    img_part1 = Image.new('L', (GRID_W, GRID_H), 255)
-    img_part2 = Image.new('L', (GRID_W, GRID_H), 255)
-
-    # Map each value in the grid to a color value, darker for higher values
-    # https://www.desmos.com/calculator/af3ywlndbh
-    def color_map(n):
-        return int(2**(-n+8) - 1)
-
-    for i in range(GRID_H):
-        for j in range(GRID_W):
-            img_part1.putpixel( (i, j), color_map(int(grid_hv[i,j])) )
-            img_part2.putpixel( (i, j), color_map(int(grid[i,j])) )
-
-    img_part1.save('day05_part1.png')
-    img_part2.save('day05_part2.png')
+    render_overlaps(grid_hv).save('day05_part1.png')
+    render_overlaps(grid).save('day05_part2.png')
 
 
     ## Output -- Answer
-    total_overlaps_hv = 0
-    for value in np.nditer(grid_hv):
-        if value >= 2: total_overlaps_hv += 1
-
-    total_overlaps = 0
-    for value in np.nditer(grid):
-        if value >= 2: total_overlaps += 1
+    total_overlaps_hv = count_at_least( overlap_stats(grid_hv).histogram, 2 )
+    total_overlaps = count_at_least( overlap_stats(grid).histogram, 2 )
 
     print(f"[Part 1] There are {total_overlaps_hv} points where two or more horizontal or vertical lines overlap.")
 
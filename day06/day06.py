@@ -3,22 +3,33 @@
 ## Jesse Williams | github.com/xram64
 ## Answers: [Part 1]: 390011, [Part 2]: 1746710169834
 
+import sys
 from time import time
+from collections import deque
+from functools import lru_cache
 
 DAYS_PART1 = 80
 DAYS_PART2 = 256
 
-def advance(age):
+# A fish spawns a new fish every SPAWN_PERIOD days, resetting its timer to (SPAWN_PERIOD - 1).
+# A newborn fish needs NEWBORN_DELAY extra days for its first cycle, so it starts with a timer of (SPAWN_PERIOD - 1 + NEWBORN_DELAY).
+SPAWN_PERIOD = 7
+NEWBORN_DELAY = 2
+
+def advance(age, spawn_period=SPAWN_PERIOD, newborn_delay=NEWBORN_DELAY):
     # Returns a tuple with the new age of the current fish, followed by the
     #   age of a new fish if one should be spawned (otherwise, None)
     if age > 0:
-        return (fish - 1, None)
+        return (age - 1, None)
     else:
-        return (6, 8)
+        return (spawn_period - 1, spawn_period - 1 + newborn_delay)
 
-def count_spawns(age, remaining_days):
+def count_spawns(age, remaining_days, spawn_period=SPAWN_PERIOD, newborn_delay=NEWBORN_DELAY, recurse=None):
     # Returns the number of additional fish generated by a given fish, based on its initial age
     #   and the number of days left until the end of the simulation.
+    # 'recurse(age, remaining_days, spawn_period, newborn_delay)' is called for each spawned fish (see SpawnCounter);
+    #   by default, this function is called again.
+    recurse = recurse or count_spawns
 
     # Keep track of the number of spawns seen at this level of the function.
     # This will be passed up to the previous level to be added to the grand total.
@@ -30,7 +41,7 @@ def count_spawns(age, remaining_days):
     if remaining_days > age:
         # If this fish will spawn at least one additional fish, calculate how many will be spawned in total.
         # https://www.desmos.com/calculator/lumde55zpk
-        fish_spawned = int( this_fish_remaining_days/7 + 1 )
+        fish_spawned = this_fish_remaining_days//spawn_period + 1
         total_spawns += fish_spawned
     else:
         # Otherwise, end the recursion by passing back 0 (the for loop will be skipped).
@@ -39,58 +50,194 @@ def count_spawns(age, remaining_days):
     # If this is the first fish spawned by the given fish, use the given fish's
     #   starting age to determine how long it takes the next fish to spawn.
     # If the given fish has already spawned one fish, the second or later
-    #   fish should always spawn after a multiple of 7 (6+1) days.
-    # For initial fish, age ∈ [1,5]. For spawned fish, age = 8.
+    #   fish should always spawn after a multiple of 7 (6+1) days (the spawn period).
+    # For initial fish, age ∈ [1,5]. For spawned fish, age = 8 (with the default spawn period and newborn delay).
 
     # If we got at least one spawn, run this function again on each new fish.
     for n in range(fish_spawned):
-        next_fish_remaining_days = this_fish_remaining_days - 7*n
+        next_fish_remaining_days = this_fish_remaining_days - spawn_period*n
 
         # A spawned fish will have an initial age of 8 (zero-indexed).
-        total_spawns += count_spawns(8, next_fish_remaining_days)
+        total_spawns += recurse(spawn_period - 1 + newborn_delay, next_fish_remaining_days, spawn_period, newborn_delay)
 
     return total_spawns
 
+class SpawnCounter():
+    # Memoized version of count_spawns, which caches the result for each (age, remaining_days) pair.
+    # Every spawned fish starts with the same age, so the same subtrees come up over and over again.
+    # The cache is an LRU cache holding at most 'maxsize' results (None for no limit).
+    # This is still recursive, about one level per newborn cycle (9 days), so very large day counts hit Python's recursion limit.
+    def __init__(self, maxsize=2**16, spawn_period=SPAWN_PERIOD, newborn_delay=NEWBORN_DELAY):
+        def cached_count_spawns(age, remaining_days, spawn_period, newborn_delay):
+            return count_spawns(age, remaining_days, spawn_period, newborn_delay, recurse=self.count_spawns)
+
+        self.count_spawns = lru_cache(maxsize=maxsize)(cached_count_spawns)
+        self.spawn_period = spawn_period
+        self.newborn_delay = newborn_delay
+        self.calls = 0       # number of calls to 'count_fish'
+        self.total_time = 0  # time spent in 'count_fish' (seconds)
+
+    def count_fish(self, fish_list, days):
+        # Returns the total number of fish after the given number of days, including the initial fish
+        t_start = time()
+        total_fish = sum( self.count_spawns(age, days, self.spawn_period, self.newborn_delay) + 1 for age in fish_list )
+
+        self.calls += 1
+        self.total_time += time() - t_start
+        return total_fish
+
+    def report(self):
+        # Returns a summary of the cache usage and timing
+        info = self.count_spawns.cache_info()
+        lookups = info.hits + info.misses
+        hit_rate = (100*info.hits/lookups) if lookups else 0
+        return (f"{self.calls} calls in {round(self.total_time, 4)}s. "
+                f"Cache: {info.hits} hits, {info.misses} misses ({round(hit_rate, 2)}% hit rate), {info.currsize}/{info.maxsize} entries.")
+
+def benchmark_spawn_counting(fish_list, day_counts, maxsize=2**16, time_limit=10):
+    # Compares the uncached recursion against a SpawnCounter across increasing day counts, printing the time taken by each.
+    # The uncached recursion grows exponentially with the day count, so it's skipped for any day count after it
+    #   takes longer than 'time_limit' seconds.
+    uncached_viable = True
+
+    for days in sorted(day_counts):
+        if uncached_viable:
+            t_start = time()
+            uncached_total = sum( count_spawns(age, days) + 1 for age in fish_list )
+            uncached_time = time() - t_start
+            uncached_viable = uncached_time <= time_limit
+            uncached_result = f"{round(uncached_time, 4)}s"
+        else:
+            uncached_total = None
+            uncached_result = "skipped"
+
+        counter = SpawnCounter(maxsize)
+        cached_total = counter.count_fish(fish_list, days)
+        if (uncached_total is not None) and (uncached_total != cached_total):
+            raise RuntimeError(f"Cached and uncached counts differ after {days} days.")
+
+        print(f"[{days} days] {cached_total} lanternfish. Uncached: {uncached_result}. Cached: {counter.report()}")
+
+def count_timers(fish_list, spawn_period=SPAWN_PERIOD, newborn_delay=NEWBORN_DELAY):
+    # Returns the number of fish with each timer value, as a list indexed by timer value (0-8 by default)
+    timer_counts = [0]*(spawn_period + newborn_delay)
+    for age in fish_list:
+        timer_counts[age] += 1
+    return timer_counts
+
+def simulate_population(timer_counts, days, spawn_period=SPAWN_PERIOD):
+    # Returns the total number of fish after the given number of days, tracking only the number of fish
+    #   with each timer value rather than each fish, so memory use doesn't grow with the population.
+    # Each day, every timer counts down by rotating the counts one place to the left. The fish at 0 move
+    #   to the end of the list (timer 8) as the newborns, and their parents are added back in at timer 6.
+    timers = deque(timer_counts)
+    for _ in range(days):
+        timers.rotate(-1)
+        timers[spawn_period - 1] += timers[-1]
+
+    return sum(timers)
+
+
+class PopulationForecast():
+    # Answers population queries for far-off days (and many days at once) without simulating every day.
+    # One day of the timer counts is a linear map, so it can be written as a transition matrix M, and the
+    #   counts after n days are (M^n × initial counts). M^n is applied by exponentiation by squaring, with
+    #   the squarings M, M², M⁴, ... computed once and shared between queries.
+    # With a modulus, all arithmetic is done modulo that number (otherwise, Python's big ints are exact).
+    def __init__(self, timer_counts, spawn_period=SPAWN_PERIOD, newborn_delay=NEWBORN_DELAY, modulus=None):
+        self.size = spawn_period + newborn_delay
+        self.modulus = modulus
+        timer_counts = list(timer_counts)
+        if len(timer_counts) > self.size: raise ValueError(f'Timers can only range from 0 to {self.size - 1}.')
+        self.initial = self._reduce( timer_counts + [0]*(self.size - len(timer_counts)) )
+
+        # Row i of the transition matrix gives the new count at timer i from the old counts
+        transition = [[0]*self.size for _ in range(self.size)]
+        for timer in range(self.size - 1):
+            transition[timer][timer + 1] = 1     # timers count down
+        transition[self.size - 1][0] = 1         # newborns
+        transition[spawn_period - 1][0] += 1     # parents reset
+
+        self._squarings = [transition]  # M^(2^k) for k = 0, 1, 2, ...
+        self._cache = {0: sum(self.initial)}  # maps days to populations
+
+        # Latest state reached by 'populations', to continue from for the next (later) query
+        self._last_day = 0
+        self._last_timers = self.initial
+
+    def _reduce(self, values):
+        return values if (self.modulus is None) else [v % self.modulus for v in values]
+
+    def _multiply(self, a, b):
+        # Matrix product a × b
+        return [self._reduce([ sum(a_ik*b[k][j] for k, a_ik in enumerate(row)) for j in range(self.size) ]) for row in a]
+
+    def _apply(self, matrix, timers):
+        # Matrix-vector product matrix × timers
+        return self._reduce([ sum(m*t for m, t in zip(row, timers)) for row in matrix ])
+
+    def _advance(self, timers, days):
+        # Returns the timer counts after the given number of days, starting from the given counts
+        k = 0
+        while days:
+            if k == len(self._squarings):
+                self._squarings.append( self._multiply(self._squarings[-1], self._squarings[-1]) )
+            if days & 1:
+                timers = self._apply(self._squarings[k], timers)
+            days >>= 1
+            k += 1
+        return timers
+
+    def population(self, day):
+        # Returns the number of fish after the given number of days (modulo the modulus, if given)
+        if day < 0: raise ValueError('Day must not be negative.')
+        if day not in self._cache:
+            self._cache[day] = self._reduce([ sum(self._advance(self.initial, day)) ])[0]
+        return self._cache[day]
+
+    def populations(self, days):
+        # Returns a dict mapping each of the given days to its population
+        # Days are answered in sorted order, each one continuing from the state of the one before it
+        #   (or from the latest state of an earlier batch), so a sorted batch only advances the whole range once.
+        days = sorted(set(days))
+        if days and (days[0] < 0): raise ValueError('Day must not be negative.')
+
+        results = {}
+        for day in days:
+            if day in self._cache:
+                results[day] = self._cache[day]
+                continue
+
+            if day < self._last_day:
+                self._last_day, self._last_timers = 0, self.initial
+
+            self._last_timers = self._advance(self._last_timers, day - self._last_day)
+            self._last_day = day
+            results[day] = self._cache[day] = self._reduce([ sum(self._last_timers) ])[0]
+
+        return results
+
 
 if __name__ == '__main__':
     with open('day06_input.txt', 'r') as f:
         fishesz = f.readline().split(',')
         fish_list = [int(fish) for fish in fishesz]
 
-    t_start = time()
+    timer_counts = count_timers(fish_list)
 
     ## Part 1
-    day = 0  # initial state
-    fishes = fish_list.copy()
-
-    for day in range(DAYS_PART1):
-        new_fishes = []
-
-        for i, fish in enumerate(fishes):
-            fish, new_fish = advance(fish)
-            fishes[i] = fish
-            if new_fish:
-                new_fishes.append(new_fish)
-
-        fishes.extend(new_fishes)
-
-    print(f"[Part 1] After 80 days, there are {len(fishes)} lanternfish. [Took {round(time() - t_start, 2)}s]")
+    t_start = time()
+    total_fish = simulate_population(timer_counts, DAYS_PART1)
+    print(f"[Part 1] After {DAYS_PART1} days, there are {total_fish} lanternfish. [Took {round(time() - t_start, 2)}s]")
 
 
     ## Part 2
-    full_count = 0
-    fishes = fish_list.copy()
-    i = 0
-
-    # For each fish, calculate the number of "roll-overs" the age would take within 256 days,
-    #   which would give the total number of new fish spawned by the given fish.
-    # Then, recursively calculate the same for each descendant fish to get a total for the given fish.
-    for fish in fishes:
-        # Add up all descendants of this fish recursively (+1 to include this fish itself)
-        full_count += count_spawns(fish, DAYS_PART2) + 1
-
-        i += 1
-        print(f"Fish #{i} (initial value {fish}) done. Now at {full_count} total fish...")
+    t_start = time()
+    total_fish = simulate_population(timer_counts, DAYS_PART2)
+    print(f"[Part 2] After {DAYS_PART2} days, there are {total_fish} lanternfish. [Took {round(time() - t_start, 2)}s]")
 
 
-    print(f"[Part 2] After 256 days, there are {full_count} lanternfish. [Took {round(time() - t_start, 2)}s]")
+    ## Benchmark (run with 'python day06.py benchmark')
+    if 'benchmark' in sys.argv[1:]:
+        print()
+        benchmark_spawn_counting(fish_list, [16, 32, 64, 80, 96, 112, 128, 256, 512, 1024])
@@ -3,13 +3,155 @@
 ## Jesse Williams | github.com/xram64
 ## Answers: [Part 1]: 329389, [Part 2]: 86397080
 
-from sys import maxsize as MAXINT
 from functools import reduce
+import numpy as np
+from collections import namedtuple
 
 def triangleSum(n):
     # https://en.wikipedia.org/wiki/Triangular_number
     # Σ_n{k} = n(n+1)/2
-    return int(n*(n+1)/2)
+    return n*(n+1)//2
+
+def linearFuel(positions, final_pos):
+    # Total fuel for all crabs to move to final_pos, at 1 fuel per step
+    # S(x)  =  Σ|Ci - x|
+    return int( np.abs(positions - final_pos).sum() )
+
+def sumOfSquares(positions):
+    # Exact Σ Ci² as a Python int, for positions up to 2^32 (Ci² itself can overflow 64 bits when summed)
+    # Each position is split into 16-bit halves, Ci = (a·2^16 + b), so Ci² = a²·2^32 + 2ab·2^16 + b²,
+    #   and each of those partial sums fits in 64 bits for up to ~10^9 crabs.
+    a, b = positions >> 16, positions & 0xffff
+    return (int((a*a).sum()) << 32) + (int((a*b).sum()) << 17) + int((b*b).sum())
+
+def triangularFuel(positions, final_pos, sum_of_squares=None):
+    # Total fuel for all crabs to move to final_pos, where the kth step costs k fuel
+    # Σ T(|Ci - x|)  =  ½ Σ((Ci - x)² + |Ci - x|)  =  ½ (ΣCi² - 2xΣCi + nx² + Σ|Ci - x|)
+    if sum_of_squares is None: sum_of_squares = sumOfSquares(positions)
+    n, total = len(positions), int(positions.sum())
+    return (sum_of_squares - 2*final_pos*total + n*final_pos**2 + linearFuel(positions, final_pos)) // 2
+
+def alignLinear(positions):
+    # Returns (final position, total fuel) with the least fuel for linear costs, in O(n) time.
+    # S(x) is minimized at the median, and the lower median is the left-most position with the least fuel.
+    positions = np.asarray(positions, dtype=np.int64)
+    median = int( np.partition(positions, (len(positions) - 1)//2)[(len(positions) - 1)//2] )
+    return (median, linearFuel(positions, median))
+
+def alignTriangular(positions):
+    # Returns (final position, total fuel) with the least fuel for triangular costs, in O(n) time.
+    # The fuel is ½(Σ(Ci - x)² + Σ|Ci - x|). The first term is minimized at the mean, and the second one
+    #   can only shift the minimum by up to ½ from there, so the best position is next to the mean.
+    positions = np.asarray(positions, dtype=np.int64)
+    sum_of_squares = sumOfSquares(positions)
+    mean = int(positions.sum()) // len(positions)
+
+    # Compare (total fuel, target position) pairs, so ties go to the left-most position
+    total_fuel, final_pos = min( (triangularFuel(positions, x, sum_of_squares), x) for x in (mean - 1, mean, mean + 1) )
+    return (final_pos, total_fuel)
+
+
+## Convex cost functions
+# A cost function gives the fuel needed to move a given distance. It should be convex (each extra step costs at least
+#   as much as the one before), which makes the total fuel convex in the final position as well.
+# These all work on single distances or on whole arrays of distances.
+def linearCost(d):
+    return d
+
+def triangularCost(d):
+    return d*(d+1)//2
+
+def quadraticCost(d):
+    return d*d
+
+def cappedStepCost(cap):
+    # The kth step costs min(k, cap) fuel, so steps get more expensive until they level off at 'cap'
+    def cost(d):
+        steps_below_cap = np.minimum(d, cap)
+        fuel = triangularCost(steps_below_cap) + cap*(d - steps_below_cap)
+        return fuel.item() if isinstance(fuel, np.generic) else fuel  # keep single distances as Python ints
+    return cost
+
+# position: best final position (left-most, if tied)
+# fuel: total fuel consumed
+# evaluations: number of final positions whose total fuel was evaluated
+Alignment = namedtuple('Alignment', ['position', 'fuel', 'evaluations'])
+
+def _groupPositions(positions, weights=None):
+    # Returns the distinct positions along with the number (or total weight) of crabs at each
+    distinct, inverse = np.unique(np.asarray(positions, dtype=np.int64), return_inverse=True)
+    counts = np.bincount(inverse, weights=weights, minlength=len(distinct))
+    if weights is None: counts = counts.astype(np.int64)
+    return distinct, counts
+
+def _fitsInt64(cost, max_distance, counts):
+    # Checks if every total fuel is small enough to be summed in 64-bit ints without wrapping around.
+    # No crab moves further than max_distance and the cost never decreases with distance, so no total can be larger
+    #   than (cost of max_distance × number of crabs). The bound is worked out with exact Python ints.
+    bound = cost(int(max_distance)) * counts.sum().item()
+    return bound <= np.iinfo(np.int64).max
+
+def alignConvex(positions, cost, weights=None, vectorized=True):
+    # Returns the Alignment with the least total fuel for any convex cost function, using a logarithmic number of evaluations.
+    #  - weights: optional per-crab multipliers for the fuel each crab uses
+    #  - vectorized: if True, cost is called once per evaluation with an array of distances (NumPy ufunc form);
+    #    otherwise, cost is called with one distance at a time (using exact Python ints).
+    #    If the totals could overflow 64-bit ints, the exact path is used anyway, so cost needs to work on single distances too.
+    # Integer ternary search: since the total fuel F(x) is convex, comparing F(m) with F(m+1) shows which side of m
+    #   the minimum is on (F(m+1) >= F(m) means the left-most minimum is at m or before), halving the range each time.
+    distinct, counts = _groupPositions(positions, weights)
+    evaluated = {}
+
+    if vectorized and not _fitsInt64(cost, distinct[-1] - distinct[0], counts):
+        vectorized = False
+
+    def totalFuel(x):
+        if x not in evaluated:
+            distances = np.abs(distinct - x)
+            if vectorized:
+                evaluated[x] = (counts * cost(distances)).sum().item()
+            else:
+                evaluated[x] = sum( count*cost(d) for count, d in zip(counts.tolist(), distances.tolist()) )
+        return evaluated[x]
+
+    lo, hi = int(distinct[0]), int(distinct[-1])
+    while lo < hi:
+        mid = (lo + hi)//2
+        if totalFuel(mid + 1) >= totalFuel(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+
+    return Alignment(lo, totalFuel(lo), len(evaluated))
+
+def alignBySweep(positions, cost, weights=None, max_range=2**14):
+    # Returns the Alignment with the least total fuel by evaluating every final position at once, for any separable cost.
+    # With a histogram h of the crab positions, the total fuel at every position is the convolution of h with the
+    #   cost of each distance, F(x) = Σ h[p]·cost(|p - x|). This takes O(range²) work in a single vectorized pass,
+    #   so it only suits small position ranges (up to 'max_range'), but doesn't need the cost to be convex.
+    # If the totals could overflow 64-bit ints, the convolution is done with exact Python ints instead (much slower).
+    distinct, counts = _groupPositions(positions, weights)
+    lo, hi = int(distinct[0]), int(distinct[-1])
+    if (hi - lo + 1) > max_range:
+        raise ValueError(f'Position range of {hi - lo + 1} is too large to sweep (max_range = {max_range}). Use alignConvex instead.')
+
+    dtype = counts.dtype if _fitsInt64(cost, hi - lo, counts) else object
+
+    histogram = np.zeros(hi - lo + 1, dtype=dtype)
+    histogram[distinct - lo] = counts.astype(dtype)
+
+    # Kernel of costs for distances -(range-1), ..., 0, ..., (range-1)
+    distances = np.abs(np.arange(-(hi - lo), hi - lo + 1))
+    if dtype == object:
+        kernel = np.array([cost(d) for d in distances.tolist()], dtype=object)
+    else:
+        kernel = cost(distances)
+    totals = np.convolve(histogram, kernel, mode='valid')
+
+    best = int(np.argmin(totals))  # argmin picks the left-most position if tied
+    fuel = totals[best]
+    return Alignment(lo + best, fuel.item() if isinstance(fuel, np.generic) else fuel, len(totals))
+
 
 if __name__ == '__main__':
     with open('day07_input.txt', 'r') as f:
@@ -22,31 +164,12 @@ if __name__ == '__main__':
 
 
     ## Part 1
-    positions_sorted = sorted(positions)
-
-    pos_min = positions_sorted[0]
-    pos_max = positions_sorted[-1]
-
-    minimum = (0, MAXINT)  # (target position, total fuel consumed)
-
-    for final_pos in range(pos_min, pos_max+1):
-        pos_changes = map(lambda pos: abs(pos - final_pos), positions)
-        total_fuel = sum(pos_changes)
-
-        if (total_fuel < minimum[1]):
-            minimum = (final_pos, total_fuel)
+    minimum = alignLinear(positions)  # (target position, total fuel consumed)
 
     print(f"[Part 1] Final horizontal position: {minimum[0]}. Total fuel consumed: {minimum[1]}.")
 
 
     ## Part 2
-    minimum = (0, MAXINT)  # (target position, total fuel consumed)
-
-    for final_pos in range(pos_min, pos_max+1):
-        pos_changes = map(lambda pos: triangleSum(abs(pos - final_pos)), positions)
-        total_fuel = sum(pos_changes)
-
-        if (total_fuel < minimum[1]):
-            minimum = (final_pos, total_fuel)
+    minimum = alignTriangular(positions)  # (target position, total fuel consumed)
 
     print(f"[Part 2] Final horizontal position: {minimum[0]}. Total fuel consumed: {minimum[1]}.")
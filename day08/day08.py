@@ -3,7 +3,10 @@
 ## Jesse Williams | github.com/xram64
 ## Answers: [Part 1]: 470, [Part 2]: 989396
 
+import os
+import numpy as np
 from enum import Enum, auto
+from itertools import permutations, islice
 
 ## Digits by number of lit segments:
 #  2 segments: 1
@@ -74,103 +77,151 @@ DIGIT_9 = ALL_SEGMENTS - {Seg.SW}
 DIGIT = [DIGIT_0, DIGIT_1, DIGIT_2, DIGIT_3, DIGIT_4, DIGIT_5, DIGIT_6, DIGIT_7, DIGIT_8, DIGIT_9]
 
 
+def renderGlyph(n):
+    # Returns the five display lines for a digit
+    display_lines = ["   ", "   ", "   ", "   ", "   "]
+    if Seg.N in DIGIT[n]:
+        display_lines[0] = "###"
+    if Seg.NW in DIGIT[n]:
+        display_lines[1] = "#" + display_lines[1][1:]
+    if Seg.NE in DIGIT[n]:
+        display_lines[1] = display_lines[1][:2] + "#"
+    if Seg.C in DIGIT[n]:
+        display_lines[2] = "###"
+    if Seg.SW in DIGIT[n]:
+        display_lines[3] = "#" + display_lines[3][1:]
+    if Seg.SE in DIGIT[n]:
+        display_lines[3] = display_lines[3][:2] + "#"
+    if Seg.S in DIGIT[n]:
+        display_lines[4] = "###"
+
+    # Add some extra characters for '0', '1', '4', and '7' to display correctly
+    if (n == 0):
+        display_lines[2] = "# #"
+    elif (n == 1):
+        display_lines[0] = display_lines[0][:2] + "#"
+        display_lines[2] = display_lines[2][:2] + "#"
+        display_lines[4] = display_lines[4][:2] + "#"
+    elif (n == 4):
+        display_lines[0] = "# #"
+        display_lines[4] = display_lines[4][:2] + "#"
+    elif (n == 7):
+        display_lines[2] = display_lines[2][:2] + "#"
+        display_lines[4] = display_lines[4][:2] + "#"
+
+    return display_lines
+
+# Display lines for each digit, rendered once
+GLYPHS = [renderGlyph(n) for n in range(10)]
+
+def formatDigits(digits):
+    # Returns a formatted visual display of a list of digits, side by side
+    return '\n'.join( ''.join(GLYPHS[n][i] + " " for n in digits) for i in range(5) )
+
+
+def encodePattern(letters):
+    # Encodes a string of segment letters ('a'-'g') as a 7-bit mask, with bit 0 for 'a' through bit 6 for 'g'
+    mask = 0
+    for letter in letters:
+        mask |= 1 << (ord(letter) - ord('a'))
+    return mask
+
+def decodeLetter(mask):
+    # Returns the letter of a mask with a single segment bit set
+    return chr(ord('a') + mask.bit_length() - 1)
+
+
 class Display():
     def __init__(self, tests, outputs):
         self.outputs = outputs
         self.output_digits = None
 
-        # Fill a dict with the letter sequences for each length of segment string
-        letter_sequences = {2:[], 3:[], 4:[], 5:[], 6:[], 7:[]}
+        # Group the wiring patterns for each length of segment string, as 7-bit masks
+        # The number of lit segments is the popcount of a mask
+        masks_by_count = {2:[], 3:[], 4:[], 5:[], 6:[], 7:[]}
         for test in tests:
-            letter_sequences[len(test)].append(test)
+            mask = encodePattern(test)
+            masks_by_count[mask.bit_count()].append(mask)
 
-        # Final determined segments
+        # Final determined segments, as single-bit masks
         segments = {}
-        # Discovered digits corresponding to each letter string
+        # Discovered digits corresponding to each pattern mask
         digits = {}
 
 
         ##| —{1}— |##
-        digits['1'] = set(letter_sequences[2][0])
+        digits['1'] = masks_by_count[2][0]
 
         ##| —{2}— |##
-        for seq in letter_sequences[6]:
-            if (digits['1'] - set(seq)) != set():
-                # If we don't get an empty set, this sequence must be 6
-                digits['6'] = set(seq)
-                # We can identify NE by the remaining letter after subtracting '6'
-                segments[Seg.NE] = list(digits['1'] - set(seq))[0]
-                # We can identify SE by the other letter from '1'
-                segments[Seg.SE] = list(digits['1'] - set(segments[Seg.NE]))[0]
+        for mask in masks_by_count[6]:
+            if (digits['1'] & ~mask) != 0:
+                # If a letter from '1' is missing, this pattern must be 6
+                digits['6'] = mask
+                # We can identify NE by the missing letter, and SE by the other letter from '1'
+                segments[Seg.NE] = digits['1'] & ~mask
+                segments[Seg.SE] = digits['1'] ^ segments[Seg.NE]
                 break
 
         ##| —{3}— |##
-        for seq in letter_sequences[5]:
-            if (segments[Seg.NE] in seq) and (segments[Seg.SE] in seq):
-                digits['3'] = set(seq)
-            elif (segments[Seg.NE] in seq):
-                digits['2'] = set(seq)
-            elif (segments[Seg.SE] in seq):
-                digits['5'] = set(seq)
+        for mask in masks_by_count[5]:
+            if (mask & segments[Seg.NE]) and (mask & segments[Seg.SE]):
+                digits['3'] = mask
+            elif (mask & segments[Seg.NE]):
+                digits['2'] = mask
+            elif (mask & segments[Seg.SE]):
+                digits['5'] = mask
 
         ##| —{4}— |##
-        digits['7'] = set(letter_sequences[3][0])
-        segments[Seg.N] = list(digits['7'] - digits['1'])[0]
+        digits['7'] = masks_by_count[3][0]
+        segments[Seg.N] = digits['7'] ^ digits['1']
 
         ##| —{5}— |##
-        digits['4'] = set(letter_sequences[4][0])
-        segments[Seg.NW] = list(digits['4'] - digits['3'])[0]
-        segments[Seg.C] = list(digits['4'] - digits['1'] - set(segments[Seg.NW]))[0]
+        digits['4'] = masks_by_count[4][0]
+        segments[Seg.NW] = digits['4'] & ~digits['3']
+        segments[Seg.C] = digits['4'] & ~digits['1'] & ~segments[Seg.NW]
 
         ##| —{6}— |##
-        for seq in letter_sequences[6]:
-            if set(seq) == digits['6']:
+        for mask in masks_by_count[6]:
+            if mask == digits['6']:
                 pass  # we've already identified the '6'
-            elif segments[Seg.C] in seq:
-                digits['9'] = set(seq)
-            elif segments[Seg.C] not in seq:
-                digits['0'] = set(seq)
+            elif mask & segments[Seg.C]:
+                digits['9'] = mask
+            else:
+                digits['0'] = mask
 
         ##| —{7}— |##
-        digits['8'] = set(letter_sequences[7][0])
-        segments[Seg.SW] = list(digits['8'] - digits['9'])[0]
+        digits['8'] = masks_by_count[7][0]
+        segments[Seg.SW] = digits['8'] & ~digits['9']
 
         ##| —{8}— |##
-        # Removing all determined segment letters from '8', we're left with the S segment
-        segments[Seg.S] = list(digits['8'] - set(segments.values()))[0]
+        # Removing all determined segment bits from '8', we're left with the S segment
+        segments[Seg.S] = digits['8'] & ~(segments[Seg.N] | segments[Seg.NW] | segments[Seg.NE] | segments[Seg.C] | segments[Seg.SW] | segments[Seg.SE])
 
         # Save letters corresponding to each segment for this display
-        self.N = segments[Seg.N]
-        self.NW = segments[Seg.NW]
-        self.NE = segments[Seg.NE]
-        self.C = segments[Seg.C]
-        self.SW = segments[Seg.SW]
-        self.SE = segments[Seg.SE]
-        self.S = segments[Seg.S]
+        self.N = decodeLetter(segments[Seg.N])
+        self.NW = decodeLetter(segments[Seg.NW])
+        self.NE = decodeLetter(segments[Seg.NE])
+        self.C = decodeLetter(segments[Seg.C])
+        self.SW = decodeLetter(segments[Seg.SW])
+        self.SE = decodeLetter(segments[Seg.SE])
+        self.S = decodeLetter(segments[Seg.S])
 
         # Create lookup dict for letters corresponding to their segment
         self.segmentFor = {self.N: Seg.N, self.NW: Seg.NW, self.NE: Seg.NE, self.C: Seg.C, self.SW: Seg.SW, self.SE: Seg.SE, self.S: Seg.S}
 
+        # Create a 128-entry lookup table from pattern masks to digits (None for patterns that aren't digits)
+        self.digitFor = [None]*128
+        for n, DIG in enumerate(DIGIT):
+            digit_mask = 0
+            for seg in DIG:
+                digit_mask |= segments[seg]
+            self.digitFor[digit_mask] = n
+
 
     def _parseOutputNumbers(self):
         # Returns a list of the numbers found in the output
-        output_digits = []
-
-        # Check each digit in 4-digit output number
-        for digit_letters in self.outputs:
-
-            # Scan through letters within number, collecting the corresponding segments
-            segs = set()
-            for letter in digit_letters:
-                segs |= {self.segmentFor[letter]}
-
-            # Identify the digit that contains these segments
-            for n, DIG in enumerate(DIGIT):
-                if DIG == segs:
-                    output_digits.append(n)
-                    break
-
-        self.output_digits = output_digits
+        # Each digit in the 4-digit output number is looked up by its pattern mask
+        self.output_digits = [self.digitFor[encodePattern(digit_letters)] for digit_letters in self.outputs]
 
     def getOutputNumbers(self):
         if not self.output_digits:
@@ -186,90 +237,182 @@ class Display():
         # Returns a formatted visual display of all 4 output numbers
         digits = self.getOutputNumbers()
 
-        formatted_numbers_separated = []
-        formatted_numbers_full = ["", "", "", "", ""]
-
-        for n in digits:
-            # Format display strings
-            display_lines = ["   ", "   ", "   ", "   ", "   "]
-            if Seg.N in DIGIT[n]:
-                display_lines[0] = "###"
-            if Seg.NW in DIGIT[n]:
-                display_lines[1] = "#" + display_lines[1][1:]
-            if Seg.NE in DIGIT[n]:
-                display_lines[1] = display_lines[1][:2] + "#"
-            if Seg.C in DIGIT[n]:
-                display_lines[2] = "###"
-            if Seg.SW in DIGIT[n]:
-                display_lines[3] = "#" + display_lines[3][1:]
-            if Seg.SE in DIGIT[n]:
-                display_lines[3] = display_lines[3][:2] + "#"
-            if Seg.S in DIGIT[n]:
-                display_lines[4] = "###"
-
-            # Add some extra characters for '0', '1', '4', and '7' to display correctly
-            if (n == 0):
-                display_lines[2] = "# #"
-            elif (n == 1):
-                display_lines[0] = display_lines[0][:2] + "#"
-                display_lines[2] = display_lines[2][:2] + "#"
-                display_lines[4] = display_lines[4][:2] + "#"
-            elif (n == 4):
-                display_lines[0] = "# #"
-                display_lines[4] = display_lines[4][:2] + "#"
-            elif (n == 7):
-                display_lines[2] = display_lines[2][:2] + "#"
-                display_lines[4] = display_lines[4][:2] + "#"
-
-
-            for i in range(5):
-                formatted_numbers_full[i] += (display_lines[i] + " ")
-
-            formatted_numbers_separated.append('\n'.join(display_lines))
-
-        formatted_number = '\n'.join(formatted_numbers_full)
-
-        self.formatted_numbers_separated = formatted_numbers_separated
-        self.formatted_number = formatted_number
-        return formatted_number
+        self.formatted_numbers_separated = ['\n'.join(GLYPHS[n]) for n in digits]
+        self.formatted_number = formatDigits(digits)
+        return self.formatted_number
+
+
+
+## Signature lookup
+# There are only 7! = 5040 ways to wire up the seven segments, so every possible display can be precomputed.
+# For each wiring, the set of ten scrambled patterns (as sorted masks) forms a signature that identifies it,
+#   and maps to a 128-entry table from scrambled pattern masks to digits (NOT_A_DIGIT for other masks).
+# A display line can then be decoded with one dict lookup plus one table lookup per output digit.
+SEGMENT_ORDER = [Seg.N, Seg.NW, Seg.NE, Seg.C, Seg.SW, Seg.SE, Seg.S]
+NOT_A_DIGIT = 255
+
+_signature_table = None  # built once per process (see 'getSignatureTable')
+_signature_cache_files = set()  # cache files already loaded from or saved to in this process
+SIGNATURE_CACHE_FILENAME = None  # optional file to persist the signature table in, used whenever no other file is given
+
+def patternSignature(masks):
+    # Returns the signature of a display's ten scrambled pattern masks (independent of their order)
+    return tuple(sorted(masks))
+
+def buildSignatureTable():
+    # Returns a dict mapping the signature of each possible wiring to its digit lookup table (as bytes)
+    signature_table = {}
+
+    for wiring in permutations(range(7)):
+        # wiring[i] is the letter (bit) that lights up segment SEGMENT_ORDER[i]
+        wire_bit = {seg: 1 << wiring[i] for i, seg in enumerate(SEGMENT_ORDER)}
+
+        digit_table = bytearray([NOT_A_DIGIT]*128)
+        masks = []
+        for n, DIG in enumerate(DIGIT):
+            mask = 0
+            for seg in DIG:
+                mask |= wire_bit[seg]
+            digit_table[mask] = n
+            masks.append(mask)
+
+        signature_table[patternSignature(masks)] = bytes(digit_table)
+
+    return signature_table
+
+def saveSignatureTable(signature_table, filename):
+    # Saves a signature table as plain uint8 arrays: one row of sorted pattern masks per signature, and its digit lookup table
+    signatures = np.array(list(signature_table.keys()), dtype=np.uint8)
+    digit_tables = np.frombuffer(b''.join(signature_table.values()), dtype=np.uint8).reshape(-1, 128)
+    with open(filename, 'wb') as f:
+        np.savez(f, signatures=signatures, digit_tables=digit_tables)
+
+def loadSignatureTable(filename):
+    # Loads a signature table saved by 'saveSignatureTable' (no pickled objects are ever loaded)
+    with np.load(filename, allow_pickle=False) as data:
+        signatures, digit_tables = data['signatures'], data['digit_tables']
+
+    if (signatures.dtype != np.uint8) or (digit_tables.dtype != np.uint8) or (signatures.ndim != 2) or \
+        (signatures.shape[1] != 10) or (digit_tables.shape != (len(signatures), 128)):
+        raise ValueError(f'Invalid signature table file: {filename}')
+
+    return {tuple(signature): digit_table.tobytes() for signature, digit_table in zip(signatures.tolist(), digit_tables)}
+
+def getSignatureTable(cache_filename=None):
+    # Returns the signature table, building it the first time it's needed in this process.
+    # If a cache filename is given (or set in SIGNATURE_CACHE_FILENAME), the table is loaded from that file instead of
+    #   being built, and saved to it if the file doesn't exist yet. Each file is only checked the first time it's given.
+    global _signature_table
+    if cache_filename is None: cache_filename = SIGNATURE_CACHE_FILENAME
+
+    if _signature_table is None:
+        if cache_filename and os.path.exists(cache_filename):
+            _signature_table = loadSignatureTable(cache_filename)
+        else:
+            _signature_table = buildSignatureTable()
+
+    if cache_filename and (cache_filename not in _signature_cache_files):
+        if not os.path.exists(cache_filename):
+            saveSignatureTable(_signature_table, cache_filename)
+        _signature_cache_files.add(cache_filename)
+
+    return _signature_table
+
+def decodeSignal(tests, outputs, signature_table=None):
+    # Returns the list of output digits for a display, decoded with the signature table instead of the step-by-step heuristics
+    if signature_table is None: signature_table = getSignatureTable()
+
+    digit_table = signature_table[ patternSignature(encodePattern(test) for test in tests) ]
+    return [digit_table[encodePattern(output)] for output in outputs]
 
 
-if __name__ == '__main__':
 
-    with open('day08_input.txt', 'r') as f:
-        signals = f.readlines()
+## Batch decoding
+# Each segment lights up in a fixed number of the ten digits (e.g. SE in 9 of them, SW in only 4), and
+#   this count doesn't depend on the wiring. Counting how often each letter shows up in a display's ten
+#   patterns gives that count for the segment the letter is wired to. Summing these counts over the letters
+#   of an output digit gives a score that is different for every digit, so a digit can be identified by
+#   its score alone. This only takes array sums and one table lookup, so whole files can be decoded at once.
+SEGMENT_OCCURRENCES = {seg: sum(seg in DIG for DIG in DIGIT) for seg in SEGMENT_ORDER}
+DIGIT_SCORES = [sum(SEGMENT_OCCURRENCES[seg] for seg in DIG) for DIG in DIGIT]
 
+# Lookup table from digit scores to digits
+DIGIT_FOR_SCORE = np.full(max(DIGIT_SCORES) + 1, NOT_A_DIGIT, dtype=np.uint8)
+DIGIT_FOR_SCORE[DIGIT_SCORES] = np.arange(10)
+
+# Lookup table from input bytes to segment bits ('a' -> bit 0, ..., 'g' -> bit 6, anything else -> 0)
+LETTER_BITS = np.zeros(256, dtype=np.uint8)
+LETTER_BITS[np.frombuffer(b'abcdefg', dtype=np.uint8)] = 1 << np.arange(7, dtype=np.uint8)
+
+def parseSignalMasks(raw):
+    # Parses the raw bytes of signal lines into a (lines × 14) uint8 matrix of pattern masks,
+    #   with the ten test patterns in columns 0-9 and the four output patterns in columns 10-13
+    bits = LETTER_BITS[np.frombuffer(raw, dtype=np.uint8)]
+    is_letter = bits != 0
+
+    # A pattern starts at each letter that doesn't follow another letter (indexed among the letters only)
+    letter_bits = bits[is_letter]
+    is_start = is_letter.copy()
+    is_start[1:] &= ~is_letter[:-1]
+    pattern_starts = np.flatnonzero(is_start[is_letter])
+
+    masks = np.bitwise_or.reduceat(letter_bits, pattern_starts) if len(pattern_starts) else np.zeros(0, dtype=np.uint8)
+    return masks.reshape(-1, 14)
+
+def decodeSignalMasks(masks):
+    # Decodes a (lines × 14) mask matrix, returning a (lines × 4) matrix of output digits and an array of output values
+    # Everything stays uint8: a letter shows up at most 10 times, and a score is at most 7 × 10
+    segment_bits = np.unpackbits(masks[..., None], axis=-1, bitorder='little')[..., :7]
+
+    letter_counts = segment_bits[:, :10].sum(axis=1, dtype=np.uint8)  # (lines × 7): occurrences of each letter
+    scores = (segment_bits[:, 10:] @ letter_counts[..., None])[..., 0]  # (lines × 4): score of each output digit
+
+    digits = DIGIT_FOR_SCORE[scores]
+    values = digits.astype(np.int64) @ np.array([1000, 100, 10, 1])
+    return digits, values
+
+def decodeSignalFile(filename):
+    # Decodes a whole signal file at once, returning the output digits and values (see 'decodeSignalMasks')
+    with open(filename, 'rb') as f:
+        return decodeSignalMasks( parseSignalMasks(f.read()) )
+
+def decodeSignalFileChunks(filename, chunk_lines=2**16):
+    # Streaming version of 'decodeSignalFile', which yields the output digits and values for up to
+    #   'chunk_lines' lines at a time, so files of any size can be decoded with bounded memory
+    with open(filename, 'rb') as f:
+        while chunk := list(islice(f, chunk_lines)):
+            yield decodeSignalMasks( parseSignalMasks(b''.join(chunk)) )
+
+
+if __name__ == '__main__':
 
     count = 0
     sum = 0
-    printout = ""
-
-    for signal_line in signals:
-        tests = signal_line.split()[:10]
-        outputs = signal_line.split()[11:]
 
-        # Generate an object to parse the numbers for this line
-        disp = Display(tests, outputs)
+    # Stream the printout of all numbers to the output file as each line is decoded
+    with open('day08_input.txt', 'r') as f, open('day08_output.txt', 'w', buffering=2**16) as out:
+        signature_table = getSignatureTable()
+        for signal_line in f:
+            patterns = signal_line.split()
+            tests, outputs = patterns[:10], patterns[11:]
 
-        # Collect a printout of all numbers
-        printout += disp.formatOutputNumbers() + "\n\n"
+            digits = decodeSignal(tests, outputs, signature_table)
 
+            out.write(formatDigits(digits) + "\n\n")
 
-        ## Part 1
-        for n in disp.getOutputNumbers():
-            if n in [1, 4, 7, 8]:
-                count += 1
 
+            ## Part 1
+            for n in digits:
+                if n in [1, 4, 7, 8]:
+                    count += 1
 
-        ## Part 2
-        numstr = ''
-        for n in disp.getOutputNumbers():
-            numstr += str(n)
-        sum += int(numstr)
 
+            ## Part 2
+            numstr = ''
+            for n in digits:
+                numstr += str(n)
+            sum += int(numstr)
 
-    with open('day08_output.txt', 'w') as f:
-        f.write(printout)
 
     print(f"[Part 1] There are {count} occurrences of the digits '1', '4', '7', or '8'.")
 
@@ -44,6 +44,27 @@ def findRiskLevel(map, pos, dims):
         # If all valid adjacent heights are higher, return (1 + height) as the risk level for this position.
         return (1 + map[pos])
 
+def findLowPoints(heightmap):
+    # Returns a Boolean mask of the low points in the whole heightmap, found with array comparisons instead of per-position checks.
+    # Each position is compared against the heightmap shifted by one position in each direction. The map is padded with +inf
+    #   (or the largest possible height for integer maps), so positions on the map boundary are never beaten by a missing neighbor.
+    pad_height = np.inf if (heightmap.dtype.kind == 'f') else np.iinfo(heightmap.dtype).max
+    padded = np.pad(heightmap, 1, constant_values=pad_height)
+    center = padded[1:-1, 1:-1]
+
+    return ( (center < padded[:-2, 1:-1])     # up
+           & (center < padded[1:-1, 2:])      # right
+           & (center < padded[2:, 1:-1])      # down
+           & (center < padded[1:-1, :-2]) )   # left
+
+def totalRiskLevel(heightmap, low_mask):
+    # Returns the sum of the risk levels (1 + height) of all low points
+    return int( (heightmap[low_mask].astype(np.int64) + 1).sum() )
+
+def lowPointPositions(low_mask):
+    # Returns the positions of all low points, in row-major order
+    return [Pos(int(r), int(c)) for r, c in np.argwhere(low_mask)]
+
 
 def constructGradient(stops, highlightEdges=None):
     # Expects a list of four RGB colors with format '#ffffff'
@@ -170,19 +191,9 @@ if __name__ == '__main__':
     heightmap = np.array(temparray)
     heightmap_dims = Dims(*heightmap.shape)
 
-    total_risk_level = 0
-    low_points = []
-
-    for r in range(heightmap_dims.rows):
-        for c in range(heightmap_dims.cols):
-            pos = Pos(r, c)
-
-            risk = findRiskLevel(heightmap, pos, heightmap_dims)
-            total_risk_level += risk
-
-            # If we found a low point here (non-zero risk), add its position to the list of low points
-            if (risk > 0):
-                low_points.append(pos)
+    low_mask = findLowPoints(heightmap)
+    total_risk_level = totalRiskLevel(heightmap, low_mask)
+    low_points = lowPointPositions(low_mask)
 
     print(f"[Part 1] There are {len(low_points)} low points in the heightmap with a total risk level of {total_risk_level}.")
 